@@ -1,5 +1,36 @@
+import base64
 import json
+import re
+import struct
+import zlib
 from enum import Enum, auto
+from itertools import groupby
+
+
+def _decompress(data: bytes, max_size: int=None) -> bytes:
+    """Private function decompresses a complete zlib stream.
+    Parameters:
+        data: zlib compressed bytes.
+        max_size: Maximum decompressed size, None for no limit.
+    Returns: The decompressed bytes.
+    """
+    # Allow one byte over the limit so that going over it is detected,
+    # a max_length of 0 would mean no limit at all.
+    max_length = 0 if max_size is None else max_size + 1
+    decompressor = zlib.decompressobj()
+    try:
+        decompressed = decompressor.decompress(data, max_length)
+    except zlib.error as e:
+        raise ValueError('Malformed compressed data: {}.'.format(e))
+    if max_size is not None and (
+            len(decompressed) > max_size or decompressor.unconsumed_tail):
+        raise ValueError(
+            'Decompressed size exceeds {}.'.format(max_size))
+    elif not decompressor.eof:
+        raise ValueError('Truncated compressed data.')
+    elif decompressor.unused_data:
+        raise ValueError('Data after the end of compressed data.')
+    return decompressed
 
 
 class ASCIITransportFormat:
@@ -9,6 +40,40 @@ class ASCIITransportFormat:
         JSON = auto()
         STRING = auto()
 
+    class DecodeError(ValueError):
+        """Raised when decoding rejects malformed or oversized data.
+        Attributes:
+            offset: Index into the encoded data where the error was found.
+        """
+        def __init__(self, message: str, offset: int) -> None:
+            super().__init__('{} (at offset {})'.format(message, offset))
+            self.message = message
+            self.offset = offset
+
+    # Default limits used by validated decoding, these bound how much memory
+    # a single untrusted payload can make us allocate.
+    MAX_DECODED_SIZE = 16 * 1024 * 1024
+    MAX_RUN_LENGTH = 1024 * 1024
+
+    # A single count + char run, the count is matched greedily but has to
+    # be followed by either the end of the data or a delimiter space which
+    # starts the next run, so digit and space characters are handled the same
+    # way that `decode_data` handles them.
+    _RUN_PATTERN = re.compile(r'([0-9]+)(.)(?: (?=[^ ])|\Z)', re.DOTALL)
+
+    # Default number of characters in a block when block encoding.
+    BLOCK_SIZE = 256
+
+    # Codecs block encoding picks from for each block, raw data, the
+    # `encode_data` run-length encoding, or zlib compressed data stored as
+    # base85 so that it stays a printable string.
+    BLOCK_RAW = 'r'
+    BLOCK_RLE = 'l'
+    BLOCK_ZLIB = 'z'
+
+    # Encoded length of a block in the block table, ASCII digits only.
+    _BLOCK_LENGTH_PATTERN = re.compile(r'[0-9]+')
+
     def __init__(
         self,
         data_type: SupportedTypes=None,
@@ -27,6 +92,7 @@ class ASCIITransportFormat:
         # Initialize needed object flags.
         self.encoded = encoded
         self.pseudo_encode = False
+        self.block_encode = False
 
         # Return and call the correct functions depending on data_type.
         if (data_type and data_type in ASCIITransportFormat.SupportedTypes):
@@ -41,10 +107,12 @@ class ASCIITransportFormat:
         else:
             raise ValueError('Constructor used incorrectly.')
 
-    def encode(self, force: bool=False) -> None:
+    def encode(self, force: bool=False, block_size: int=None) -> None:
         """Encode the current object's data.
         Parameters:
             force: Flag to prevent accidentally re-encoding, encoded data.
+            block_size: Use block encoding with blocks of this many
+                        characters, refer to `encode_blocks_data`.
         Returns: None
         """
         if not force and self.encoded:
@@ -55,32 +123,61 @@ class ASCIITransportFormat:
             )
         else:
             # Encode the actual data and record the result.
-            encoded_result = ASCIITransportFormat.encode_data(self.data)
+            if block_size is not None:
+                encoded_result = ASCIITransportFormat.encode_blocks_data(
+                    self.data, block_size)
+            else:
+                encoded_result = ASCIITransportFormat.encode_data(self.data)
             if len(encoded_result) < len(self.data):
                 # If actually compressed, then use compressed version
                 # which is not pseudo encoded.
                 self.data = encoded_result
                 self.psuedo_encode = False
+                self.block_encode = block_size is not None
             else:
                 # If compression is larger than original, don't use the larger
                 # version and enable pseudo encoding.
                 self.pseudo_encode = True
+                self.block_encode = False
             # Set encoded flag if this function was run.
             self.encoded = True
 
-    def decode(self) -> None:
+    def decode(
+        self,
+        validate: bool=False,
+        max_size: int=None,
+        max_run_length: int=None,
+    ) -> None:
         """Decodes the current object's data.
         Parameters:
+            validate: Flag to use `validated_decode_data`, which should be
+                      set when the data comes from an untrusted source.
+            max_size: Maximum decoded size when validating, defaults to
+                      MAX_DECODED_SIZE.
+            max_run_length: Maximum length of a single run when validating,
+                            defaults to MAX_RUN_LENGTH.
         Returns: None
         """
         if not self.encoded:
             raise ValueError('Cannot decode already decoded data.')
+        elif self.block_encode:
+            self.data = ASCIITransportFormat.decode_blocks_data(
+                self.data, validate, max_size, max_run_length)
+        elif validate:
+            # Pseudo encoded data is still bounded by the maximum size.
+            if self.pseudo_encode:
+                ASCIITransportFormat._check_size(
+                    len(self.data), max_size, 0)
+            else:
+                self.data = ASCIITransportFormat.validated_decode_data(
+                    self.data, max_size, max_run_length)
         elif not self.pseudo_encode:
             # Only run decode if not pseudo encoded.
             self.data = ASCIITransportFormat.decode_data(self.data)
         # Reset encode flags since this is now decoded.
         self.encoded = False
         self.pseudo_encode = False
+        self.block_encode = False
 
     def encode_data(data: str) -> str:
         """Encodes a string and returns the result.
@@ -169,6 +266,167 @@ class ASCIITransportFormat:
 
         return decoded_string
 
+    def decoded_size(
+        data: str,
+        max_size: int=None,
+        max_run_length: int=None,
+    ) -> int:
+        """Validates encoded data and returns its exact decoded size.
+        This is a cheap pre-pass that never builds the decoded string.
+        Parameters:
+            data: Encoded data to validate.
+            max_size: Maximum decoded size, defaults to MAX_DECODED_SIZE.
+            max_run_length: Maximum length of a single run, defaults to
+                            MAX_RUN_LENGTH.
+        Returns: The length of the string `decode_data` would return.
+        """
+        runs = ASCIITransportFormat._parse_runs(data, max_size, max_run_length)
+        return sum(count for count, _ in runs)
+
+    def validated_decode_data(
+        data: str,
+        max_size: int=None,
+        max_run_length: int=None,
+    ) -> str:
+        """Decodes untrusted encoded data and returns the result.
+        The whole input is validated before anything is allocated, so
+        malformed or oversized data is rejected with a DecodeError that
+        reports the offending offset.
+        Parameters:
+            data: Encoded data to decode.
+            max_size: Maximum decoded size, defaults to MAX_DECODED_SIZE.
+            max_run_length: Maximum length of a single run, defaults to
+                            MAX_RUN_LENGTH.
+        Returns: The decoded string result.
+        """
+        runs = ASCIITransportFormat._parse_runs(data, max_size, max_run_length)
+        return ''.join(char * count for count, char in runs)
+
+    def encode_blocks_data(data: str, block_size: int=None) -> str:
+        """Block encodes a string and returns the result.
+        The data is split into blocks and each block is stored with whichever
+        codec gives the smallest result for it, adjacent blocks that pick
+        the same codec are merged and encoded together.
+        Parameters:
+            data: String to encode.
+            block_size: Number of characters in a block, defaults to
+                        BLOCK_SIZE.
+        Returns: The encoded string result.
+        """
+        if block_size is None:
+            block_size = ASCIITransportFormat.BLOCK_SIZE
+        elif block_size < 1:
+            raise ValueError('Block size must be at least 1.')
+
+        # Empty data should return an empty string.
+        if not data:
+            return ''
+        encoders = ASCIITransportFormat._BLOCK_ENCODERS
+
+        # Blocks held as [codec, data] lists before encoding at the end.
+        blocks = []
+        for start in range(0, len(data), block_size):
+            block = data[start:start + block_size]
+            codec = min(
+                encoders, key=lambda codec: len(encoders[codec](block)))
+            if blocks and blocks[-1][0] == codec:
+                blocks[-1][1] += block
+            else:
+                blocks.append([codec, block])
+
+        # The block table is a codec + encoded length entry for each block,
+        # delimited by ',' and ended with '|', followed by every encoded block.
+        # i.e. 'l12,r256,z40|' + encoded blocks
+        table, encoded_blocks = [], []
+        for codec, block in blocks:
+            encoded_block = encoders[codec](block)
+            table.append(codec + str(len(encoded_block)))
+            encoded_blocks.append(encoded_block)
+        return ','.join(table) + '|' + ''.join(encoded_blocks)
+
+    def decode_blocks_data(
+        data: str,
+        validate: bool=False,
+        max_size: int=None,
+        max_run_length: int=None,
+    ) -> str:
+        """Decodes a block encoded string block by block and returns the
+        result.
+        Parameters:
+            data: Block encoded data to decode.
+            validate: Flag to bound the decoded size, refer to
+                      `validated_decode_data`.
+            max_size: Maximum decoded size when validating, defaults to
+                      MAX_DECODED_SIZE.
+            max_run_length: Maximum length of a single run when validating,
+                            defaults to MAX_RUN_LENGTH.
+        Returns: The decoded string result.
+        """
+        # Empty data should return an empty string.
+        if not data:
+            return ''
+        if max_size is None:
+            max_size = ASCIITransportFormat.MAX_DECODED_SIZE
+
+        table_end = data.find('|')
+        if table_end == -1:
+            raise ASCIITransportFormat.DecodeError('Missing block table', 0)
+
+        # A block can never be longer than the data, so lengths with more
+        # digits than that are rejected before int() is called on them.
+        max_digits = len(str(len(data)))
+        length_pattern = ASCIITransportFormat._BLOCK_LENGTH_PATTERN
+
+        decoded_blocks = []
+        decoded_size = 0
+        offset = table_end + 1
+        for entry in data[:table_end].split(','):
+            codec, length = entry[:1], entry[1:].lstrip('0') or '0'
+            if (codec not in ASCIITransportFormat._BLOCK_ENCODERS or
+                    not length_pattern.fullmatch(entry[1:]) or
+                    len(length) > max_digits or
+                    offset + int(length) > len(data)):
+                raise ASCIITransportFormat.DecodeError(
+                    'Malformed block table entry', offset)
+            length = int(length)
+            block = data[offset:offset + length]
+
+            # Only the remaining size budget is allowed for each block, an
+            # exhausted budget is rejected before decoding anything.
+            remaining = max_size - decoded_size if validate else None
+            if remaining is not None and remaining <= 0 and block:
+                raise ASCIITransportFormat.DecodeError(
+                    'Decoded size exceeds {}'.format(max_size), offset)
+
+            if codec == ASCIITransportFormat.BLOCK_RAW:
+                decoded_block = block
+            elif codec == ASCIITransportFormat.BLOCK_RLE and validate:
+                try:
+                    decoded_block = (
+                        ASCIITransportFormat.validated_decode_data(
+                            block, remaining, max_run_length))
+                except ASCIITransportFormat.DecodeError as e:
+                    # Report the offset into the whole data, not the block.
+                    raise ASCIITransportFormat.DecodeError(
+                        e.message, offset + e.offset)
+            elif codec == ASCIITransportFormat.BLOCK_RLE:
+                decoded_block = ASCIITransportFormat.decode_data(block)
+            else:
+                decoded_block = ASCIITransportFormat._decode_zlib_block(
+                    block, offset, remaining)
+
+            decoded_size += len(decoded_block)
+            if validate:
+                ASCIITransportFormat._check_size(
+                    decoded_size, max_size, offset)
+            decoded_blocks.append(decoded_block)
+            offset += length
+
+        if offset != len(data):
+            raise ASCIITransportFormat.DecodeError(
+                'Data after the last block', offset)
+        return ''.join(decoded_blocks)
+
     def json(self) -> str:
         """Decodes an encoded string and returns the result.
         Parameters:
@@ -183,6 +441,32 @@ class ASCIITransportFormat:
         """
         return self.data
 
+    def get_runs(
+        self,
+        validate: bool=False,
+        max_size: int=None,
+        max_run_length: int=None,
+    ) -> list:
+        """Object runs accessor, works on both encoded and decoded data.
+        Parameters:
+            validate: Flag to enforce the validated decoding limits, which
+                      should be set when the data comes from an untrusted
+                      source.
+            max_size: Maximum decoded size when validating, defaults to
+                      MAX_DECODED_SIZE.
+            max_run_length: Maximum length of a single run when validating,
+                            defaults to MAX_RUN_LENGTH.
+        Returns: The object's data as a list of (count, char) tuples.
+        """
+        data = self.data
+        if self.encoded and self.block_encode:
+            data = ASCIITransportFormat.decode_blocks_data(
+                data, validate, max_size, max_run_length)
+        elif self.encoded and not self.pseudo_encode:
+            return ASCIITransportFormat._parse_runs(
+                data, max_size, max_run_length, validate)
+        return [(len(list(group)), char) for char, group in groupby(data)]
+
     def is_encoded(self) -> bool:
         """Object encoded flag accessor.
         Parameters:
@@ -190,6 +474,104 @@ class ASCIITransportFormat:
         """
         return self.encoded
 
+    def _parse_runs(
+        data: str,
+        max_size: int=None,
+        max_run_length: int=None,
+        validate: bool=True,
+    ) -> list:
+        """Private function parses and validates encoded data into runs.
+        Parameters:
+            data: Encoded data to parse.
+            max_size: Maximum decoded size, defaults to MAX_DECODED_SIZE.
+            max_run_length: Maximum length of a single run, defaults to
+                            MAX_RUN_LENGTH.
+            validate: Flag to enforce the size and run length limits, runs
+                      are always checked for malformed data.
+        Returns: A list of (count, char) tuples.
+        """
+        if max_size is None:
+            max_size = ASCIITransportFormat.MAX_DECODED_SIZE
+        if max_run_length is None:
+            max_run_length = ASCIITransportFormat.MAX_RUN_LENGTH
+        # Counts with more significant digits than the limit are rejected
+        # before int() so huge digit strings are never converted.
+        max_digits = len(str(max_run_length))
+
+        runs = []
+        total, offset = 0, 0
+        while offset < len(data):
+            match = ASCIITransportFormat._RUN_PATTERN.match(data, offset)
+            if match is None:
+                raise ASCIITransportFormat.DecodeError(
+                    'Malformed run', offset)
+            count_string, char = match.groups()
+            count_string = count_string.lstrip('0') or '0'
+            if validate and len(count_string) > max_digits:
+                count = max_run_length + 1
+            else:
+                count = int(count_string)
+            if count == 0:
+                raise ASCIITransportFormat.DecodeError(
+                    'Run length must be positive', offset)
+            elif validate and count > max_run_length:
+                raise ASCIITransportFormat.DecodeError(
+                    'Run length exceeds {}'.format(max_run_length), offset)
+            total += count
+            if validate:
+                ASCIITransportFormat._check_size(total, max_size, offset)
+            runs.append((count, char))
+            offset = match.end()
+        return runs
+
+    def _check_size(size: int, max_size: int, offset: int) -> None:
+        """Private function raises a DecodeError if size is over the limit.
+        Parameters:
+            size: Decoded size so far.
+            max_size: Maximum decoded size, defaults to MAX_DECODED_SIZE.
+            offset: Offset to report if the limit is exceeded.
+        Returns: None
+        """
+        if max_size is None:
+            max_size = ASCIITransportFormat.MAX_DECODED_SIZE
+        if size > max_size:
+            raise ASCIITransportFormat.DecodeError(
+                'Decoded size exceeds {}'.format(max_size), offset)
+
+    def _encode_zlib_block(data: str) -> str:
+        """Private function zlib compresses a block into a base85 string.
+        Parameters:
+            data: Block to encode.
+        Returns: The encoded block.
+        """
+        return base64.b85encode(zlib.compress(data.encode(), 9)).decode()
+
+    def _decode_zlib_block(
+        data: str,
+        offset: int=0,
+        max_size: int=None,
+    ) -> str:
+        """Private function decodes a zlib compressed base85 block.
+        Parameters:
+            data: Block to decode.
+            offset: Offset of the block to report errors at.
+            max_size: Maximum decoded size, None for no limit.
+        Returns: The decoded block.
+        """
+        # Base85, zlib and UTF-8 errors are all ValueErrors.
+        try:
+            return _decompress(base64.b85decode(data), max_size).decode()
+        except ValueError as e:
+            raise ASCIITransportFormat.DecodeError(
+                'Invalid zlib block: {}'.format(str(e).rstrip('.')), offset)
+
+    # Encoders for each block codec, used to measure and encode blocks.
+    _BLOCK_ENCODERS = {
+        BLOCK_RAW: str,
+        BLOCK_RLE: encode_data,
+        BLOCK_ZLIB: _encode_zlib_block,
+    }
+
     def _populate_with_filename(self, data: str) -> None:
         """Private function populates object with data from a file.
         Parameters:
@@ -217,6 +599,7 @@ class ASCIITransportFormat:
         self.data = data['data']
         self.encoded = data['encoded']
         self.pseudo_encode = data['pseudo_encode']
+        self.block_encode = data.get('block_encode', False)
 
     def _populate_with_string(self, data: str) -> None:
         """Private function populates object with data from a string.
@@ -225,3 +608,377 @@ class ASCIITransportFormat:
         Returns: None
         """
         self.data = data
+
+
+class TerminalRenderer:
+    """Renders ASCIITransportFormat objects as terminal output.
+    Output is built straight from the encoded runs, long space runs become
+    cursor-forward escapes and, if the terminal supports it, long runs of
+    other characters become REP (repeat preceding character) escapes.
+    """
+
+    CLEAR_SCREEN = '\x1b[H\x1b[2J'
+    CLEAR_LINE = '\x1b[K'
+    NEWLINE = '\r\n'
+
+    def __init__(self, repeat: bool=False) -> None:
+        """TerminalRenderer constructor.
+        Parameters:
+            repeat: bool that says whether the terminal supports the REP
+                    escape sequence (i.e. xterm compatible terminals)
+        Returns: None
+        """
+        self.repeat = repeat
+
+    def render(
+        self,
+        obj: ASCIITransportFormat,
+        validate: bool=False,
+        max_size: int=None,
+        max_run_length: int=None,
+    ) -> str:
+        """Renders a full frame onto a cleared screen.
+        Parameters:
+            obj: ASCIITransportFormat object to render, encoded or not.
+            validate: Flag to enforce the validated decoding limits, which
+                      should be set when the data comes from an untrusted
+                      source.
+            max_size: Maximum decoded size when validating, defaults to
+                      MAX_DECODED_SIZE.
+            max_run_length: Maximum length of a single run when validating,
+                            defaults to MAX_RUN_LENGTH.
+        Returns: String of terminal output.
+        """
+        output = [TerminalRenderer.CLEAR_SCREEN]
+
+        # Spaces are held back until a visible character follows them, this
+        # way trailing spaces on a line are never sent at all.
+        pending_spaces = 0
+        runs = obj.get_runs(validate, max_size, max_run_length)
+        for count, char in runs:
+            if char == '\n':
+                pending_spaces = 0
+                output.append(TerminalRenderer.NEWLINE * count)
+            elif char == ' ':
+                pending_spaces += count
+            else:
+                if pending_spaces:
+                    output.append(TerminalRenderer._skip(pending_spaces))
+                    pending_spaces = 0
+                output.append(self._run(count, char))
+        return ''.join(output)
+
+    def render_diff(
+        self,
+        old: ASCIITransportFormat,
+        new: ASCIITransportFormat,
+        validate: bool=False,
+        max_size: int=None,
+        max_run_length: int=None,
+    ) -> str:
+        """Renders only the cells that changed between two frames.
+        Parameters:
+            old: ASCIITransportFormat object currently on screen.
+            new: ASCIITransportFormat object to draw.
+            validate: Flag to enforce the validated decoding limits on
+                      both frames, which should be set when the data comes
+                      from an untrusted source.
+            max_size: Maximum decoded size when validating, defaults to
+                      MAX_DECODED_SIZE.
+            max_run_length: Maximum length of a single run when validating,
+                            defaults to MAX_RUN_LENGTH.
+        Returns: String of terminal output.
+        """
+        old_lines = TerminalRenderer._lines(
+            old, validate, max_size, max_run_length)
+        new_lines = TerminalRenderer._lines(
+            new, validate, max_size, max_run_length)
+
+        output = []
+        for row in range(max(len(old_lines), len(new_lines))):
+            old_line = old_lines[row] if row < len(old_lines) else ''
+            new_line = new_lines[row] if row < len(new_lines) else ''
+
+            # Blank cells and spaces look the same on screen.
+            changed = [
+                column for column, char in enumerate(new_line)
+                if char != (
+                    old_line[column] if column < len(old_line) else ' ')
+            ]
+            clear_tail = old_line[len(new_line):].strip(' ') != ''
+
+            # Group consecutive changed columns into [start, end) spans.
+            spans = []
+            for column in changed:
+                if spans and spans[-1][1] == column:
+                    spans[-1][1] += 1
+                else:
+                    spans.append([column, column + 1])
+            if clear_tail:
+                spans.append([len(new_line), len(new_line)])
+
+            # Move to the first span, then skip over unchanged cells between
+            # spans with whichever of the two is shorter, rewriting them or
+            # moving the cursor forward.
+            cursor = None
+            for start, end in spans:
+                if cursor is None:
+                    output.append(TerminalRenderer._move(row, start))
+                elif cursor < start:
+                    output.append(self._forward(new_line[cursor:start]))
+                output.append(self._text(new_line[start:end]))
+                cursor = end
+            if clear_tail:
+                output.append(TerminalRenderer.CLEAR_LINE)
+        return ''.join(output)
+
+    def _run(self, count: int, char: str) -> str:
+        """Private function renders a single run of characters.
+        Parameters:
+            count: Length of the run.
+            char: Character that is repeated.
+        Returns: String of terminal output.
+        """
+        if self.repeat and count > 1 and char.isprintable():
+            escape = '\x1b[{}b'.format(count - 1)
+            if len(escape) < count - 1:
+                return char + escape
+        return char * count
+
+    def _text(self, text: str) -> str:
+        """Private function renders text that has to overwrite the screen.
+        Parameters:
+            text: Text to render.
+        Returns: String of terminal output.
+        """
+        return ''.join(
+            self._run(len(list(group)), char) for char, group in groupby(text)
+        )
+
+    def _forward(self, text: str) -> str:
+        """Private function moves past text that is already on screen.
+        Parameters:
+            text: Text between the cursor and its destination.
+        Returns: String of terminal output.
+        """
+        escape = '\x1b[{}C'.format(len(text))
+        rendered = self._text(text)
+        return escape if len(escape) < len(rendered) else rendered
+
+    def _skip(count: int) -> str:
+        """Private function moves past spaces on a cleared screen.
+        Parameters:
+            count: Number of spaces to move past.
+        Returns: String of terminal output.
+        """
+        escape = '\x1b[{}C'.format(count)
+        return escape if len(escape) < count else ' ' * count
+
+    def _move(row: int, column: int) -> str:
+        """Private function moves the cursor to a zero indexed cell.
+        Parameters:
+            row: Row to move to.
+            column: Column to move to.
+        Returns: String of terminal output.
+        """
+        return '\x1b[{};{}H'.format(row + 1, column + 1)
+
+    def _lines(
+        obj: ASCIITransportFormat,
+        validate: bool=False,
+        max_size: int=None,
+        max_run_length: int=None,
+    ) -> list:
+        """Private function splits an object's cells into lines.
+        Parameters:
+            obj: ASCIITransportFormat object, encoded or not.
+            validate: Flag to enforce the validated decoding limits, which
+                      should be set when the data comes from an untrusted
+                      source.
+            max_size: Maximum decoded size when validating, defaults to
+                      MAX_DECODED_SIZE.
+            max_run_length: Maximum length of a single run when validating,
+                            defaults to MAX_RUN_LENGTH.
+        Returns: List of strings, one per line.
+        """
+        runs = obj.get_runs(validate, max_size, max_run_length)
+        return ''.join(char * count for count, char in runs).split('\n')
+
+
+class FrameWriter:
+    """Packs many ASCIITransportFormat objects into length prefixed frames.
+    A frame is a 5 byte header, one flags byte and a big endian 4 byte
+    payload length, followed by the payload. The payload is a batch of
+    objects, each one a big endian 4 byte length followed by the object's
+    UTF-8 JSON, and the whole payload is zlib compressed if the
+    FLAG_COMPRESSED flag is set.
+    """
+
+    HEADER = struct.Struct('!BI')
+    LENGTH = struct.Struct('!I')
+    FLAG_COMPRESSED = 0x01
+
+    def __init__(self, sock=None, compress: bool=False) -> None:
+        """FrameWriter constructor.
+        Parameters:
+            sock: socket (or anything with a `sendall` method) that frames
+                  are sent over, only needed to use `send`
+            compress: bool that says whether each batch is compressed
+        Returns: None
+        """
+        self.sock = sock
+        self.compress = compress
+
+    def pack(self, objects: list) -> bytes:
+        """Packs a batch of objects into a single frame.
+        Parameters:
+            objects: List of ASCIITransportFormat objects.
+        Returns: Bytes of the frame.
+        """
+        payload = b''.join(
+            FrameWriter.LENGTH.pack(len(element)) + element
+            for element in (obj.json().encode() for obj in objects)
+        )
+        flags = 0
+        if self.compress:
+            payload = zlib.compress(payload)
+            flags |= FrameWriter.FLAG_COMPRESSED
+        return FrameWriter.HEADER.pack(flags, len(payload)) + payload
+
+    def send(self, objects: list) -> None:
+        """Packs a batch of objects into a single frame and sends it.
+        Parameters:
+            objects: List of ASCIITransportFormat objects.
+        Returns: None
+        """
+        self.sock.sendall(self.pack(objects))
+
+
+class FrameReader:
+    """Incrementally decodes frames written by FrameWriter.
+    Bytes can be fed in as they arrive in chunks of any size, objects are
+    returned as soon as the frame holding them is complete.
+    """
+
+    # Limit on both the size of a frame on the wire and its decompressed
+    # size, so a single frame cannot make the reader buffer without bound.
+    MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, max_frame_size: int=None) -> None:
+        """FrameReader constructor.
+        Parameters:
+            max_frame_size: Maximum payload size of a frame, before and
+                            after decompression, defaults to MAX_FRAME_SIZE
+        Returns: None
+        """
+        if max_frame_size is None:
+            max_frame_size = FrameReader.MAX_FRAME_SIZE
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> list:
+        """Adds received bytes and decodes any frames they complete.
+        Parameters:
+            data: Bytes received from the stream.
+        Returns: List of ASCIITransportFormat objects from complete frames.
+        """
+        self.buffer += data
+
+        objects = []
+        offset = 0
+        header_size = FrameWriter.HEADER.size
+        try:
+            while len(self.buffer) - offset >= header_size:
+                flags, length = FrameWriter.HEADER.unpack_from(
+                    self.buffer, offset)
+                if flags & ~FrameWriter.FLAG_COMPRESSED:
+                    raise ValueError(
+                        'Unknown frame flags {:#x}.'.format(flags))
+                elif length > self.max_frame_size:
+                    raise ValueError(
+                        'Frame size {} exceeds {}.'.format(
+                            length, self.max_frame_size))
+                end = offset + header_size + length
+                if len(self.buffer) < end:
+                    # Wait for the rest of the frame to arrive.
+                    break
+                payload = bytes(self.buffer[offset + header_size:end])
+                objects.extend(self._unpack(flags, payload))
+                offset = end
+        except ValueError:
+            # Objects from earlier frames are returned first, the bad frame
+            # stays at the start of the buffer so the next call raises.
+            if not objects:
+                raise
+        finally:
+            # Drop all consumed frames at once rather than one by one.
+            del self.buffer[:offset]
+        return objects
+
+    def read(self, sock, size: int=65536):
+        """Reads frames from a socket until it is closed.
+        Parameters:
+            sock: socket (or anything with a `recv` method) to read from.
+            size: Maximum number of bytes to receive at once.
+        Returns: Generator of ASCIITransportFormat objects.
+        """
+        while True:
+            data = sock.recv(size)
+            if not data:
+                break
+            yield from self.feed(data)
+        if self.buffer:
+            # Raise the error for a bad frame held back by `feed` first.
+            yield from self.feed(b'')
+            raise ValueError('Stream ended in the middle of a frame.')
+
+    def _unpack(self, flags: int, payload: bytes) -> list:
+        """Private function unpacks the objects in a frame's payload.
+        Parameters:
+            flags: Flags from the frame header.
+            payload: Payload of the frame.
+        Returns: List of ASCIITransportFormat objects.
+        """
+        if flags & FrameWriter.FLAG_COMPRESSED:
+            payload = _decompress(payload, self.max_frame_size)
+
+        objects = []
+        offset = 0
+        length_size = FrameWriter.LENGTH.size
+        while offset < len(payload):
+            if len(payload) - offset < length_size:
+                raise ValueError('Truncated object length in frame.')
+            length, = FrameWriter.LENGTH.unpack_from(payload, offset)
+            offset += length_size
+            if len(payload) - offset < length:
+                raise ValueError('Truncated object in frame.')
+            objects.append(
+                FrameReader._load(payload[offset:offset + length]))
+            offset += length
+        return objects
+
+    def _load(element: bytes) -> ASCIITransportFormat:
+        """Private function validates and loads a single object's JSON.
+        Parameters:
+            element: UTF-8 JSON of an ASCIITransportFormat object.
+        Returns: ASCIITransportFormat object.
+        """
+        try:
+            data = json.loads(element.decode())
+        except ValueError as e:
+            raise ValueError('Malformed object in frame: {}.'.format(e))
+        if (not isinstance(data, dict) or
+                not isinstance(data.get('data'), str) or
+                not isinstance(data.get('encoded'), bool) or
+                not isinstance(data.get('pseudo_encode'), bool) or
+                not isinstance(data.get('block_encode', False), bool)):
+            raise ValueError('Malformed object in frame.')
+
+        obj = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            data['data'],
+            data['encoded'],
+        )
+        obj.pseudo_encode = data['pseudo_encode']
+        obj.block_encode = data.get('block_encode', False)
+        return obj
@@ -0,0 +1,78 @@
+import socket
+import sys
+import threading
+import time
+from ascii_transport_format import (
+    ASCIITransportFormat,
+    FrameReader,
+    FrameWriter,
+)
+
+
+def benchmark(
+    obj: ASCIITransportFormat,
+    compress: bool,
+    frames: int,
+    batch_size: int,
+) -> tuple:
+    """Sends frames of copies of an object over a local socketpair.
+    Parameters:
+        obj: Encoded ASCIITransportFormat object to send.
+        compress: Whether each batch is compressed.
+        frames: Number of frames to send.
+        batch_size: Number of objects in each frame.
+    Returns: Tuple of objects per second and bytes per object.
+    """
+    batch = [obj] * batch_size
+    writer_sock, reader_sock = socket.socketpair()
+
+    def write():
+        writer = FrameWriter(writer_sock, compress)
+        for _ in range(frames):
+            writer.send(batch)
+        writer_sock.close()
+
+    start = time.perf_counter()
+    thread = threading.Thread(target=write)
+    thread.start()
+    received = sum(1 for _ in FrameReader().read(reader_sock))
+    thread.join()
+    elapsed = time.perf_counter() - start
+    reader_sock.close()
+
+    frame_size = len(FrameWriter(compress=compress).pack(batch))
+    return received / elapsed, frame_size / batch_size
+
+
+def main(file_names: list, frames: int=100, batch_size: int=50) -> None:
+    """Prints a markdown table of framed transport throughput.
+    Parameters:
+        file_names: Files containing ASCII art to send.
+        frames: Number of frames to send for each file.
+        batch_size: Number of objects in each frame.
+    Returns: None
+    """
+    print('Art | Compression | Objects per Second | Bytes per Object')
+    print('------------ | ------------- | ------------- | -------------')
+    for file_name in file_names:
+        obj = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.FILE,
+            file_name,
+        )
+        obj.encode()
+        for compress in (False, True):
+            objects_per_second, bytes_per_object = benchmark(
+                obj, compress, frames, batch_size)
+            print('{} | {} | {:.0f} | {:.1f}'.format(
+                file_name.split('/')[-1],
+                'zlib' if compress else 'none',
+                objects_per_second,
+                bytes_per_object,
+            ))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [
+        'test_files/pseudo_1.txt',
+        'test_files/ferrari.txt',
+    ])
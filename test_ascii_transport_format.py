@@ -1,5 +1,14 @@
+import base64
+import socket
+import threading
 import unittest
-from ascii_transport_format import ASCIITransportFormat
+import zlib
+from ascii_transport_format import (
+    ASCIITransportFormat,
+    FrameReader,
+    FrameWriter,
+    TerminalRenderer,
+)
 
 
 class EncodeTest(unittest.TestCase):
@@ -501,5 +510,575 @@ class ForceEncodeTest(unittest.TestCase):
             self.assertTrue(obj.pseudo_encode)
 
 
+class ValidatedDecodeTest(unittest.TestCase):
+    def testValidatedDecode(self):
+        """Test case for validated decoding matching regular decoding.
+        """
+        test_cases = [
+            '',
+            '1\n',
+            '1 ',
+            '3a 3b',
+            '1a 1  1b',
+            '11 22 33',
+            '12  3a',
+            '1001a 909b 65c 2d',
+            '4a 41 1\n 4b 42',
+        ]
+        for data in test_cases:
+            expected = ASCIITransportFormat.decode_data(data)
+            decoded_result = ASCIITransportFormat.validated_decode_data(data)
+            self.assertEqual(decoded_result, expected)
+            self.assertEqual(
+                ASCIITransportFormat.decoded_size(data), len(expected))
+
+    def testValidatedDecodeMalformed(self):
+        """Test case for malformed data being rejected with its offset.
+        """
+        test_cases = [
+            ('a', 0),
+            (' 1a', 0),
+            ('3a 3', 3),
+            ('3a 3b ', 3),
+            ('1   2a', 0),
+            ('3a  3b', 0),
+            ('3a 0b', 3),
+            ('3a 3b\n', 3),
+        ]
+        for data, offset in test_cases:
+            with self.assertRaises(ASCIITransportFormat.DecodeError) as ctx:
+                ASCIITransportFormat.validated_decode_data(data)
+            self.assertEqual(ctx.exception.offset, offset)
+            self.assertIsInstance(ctx.exception, ValueError)
+
+    def testValidatedDecodeLimits(self):
+        """Test case for oversized data being rejected before allocating.
+        """
+        with self.assertRaises(ASCIITransportFormat.DecodeError) as ctx:
+            ASCIITransportFormat.validated_decode_data('999999999999a')
+        self.assertEqual(ctx.exception.offset, 0)
+
+        with self.assertRaises(ASCIITransportFormat.DecodeError) as ctx:
+            ASCIITransportFormat.validated_decode_data(
+                '5a 5b 5c', max_run_length=4)
+        self.assertEqual(ctx.exception.offset, 0)
+
+        with self.assertRaises(ASCIITransportFormat.DecodeError) as ctx:
+            ASCIITransportFormat.validated_decode_data(
+                '5a 5b 5c', max_size=12)
+        self.assertEqual(ctx.exception.offset, 6)
+
+        self.assertEqual(
+            ASCIITransportFormat.validated_decode_data(
+                '5a 5b 5c', max_size=15, max_run_length=5),
+            'aaaaabbbbbccccc',
+        )
+
+        self.assertEqual(
+            ASCIITransportFormat.validated_decode_data('00000005a'),
+            'aaaaa',
+        )
+        with self.assertRaises(ASCIITransportFormat.DecodeError) as ctx:
+            ASCIITransportFormat.validated_decode_data('3a 0000000b')
+        self.assertEqual(ctx.exception.offset, 3)
+        self.assertIn('positive', str(ctx.exception))
+
+    def testValidatedDecodeObject(self):
+        """Test case for validated decoding using an ASCIITransportFormat
+        object.
+        """
+        obj = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            'a'*1001,
+        )
+        obj.encode()
+        obj.decode(validate=True)
+        self.assertEqual(obj.data, 'a'*1001)
+        self.assertFalse(obj.encoded)
+
+        obj = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            '1000000a',
+            encoded=True,
+        )
+        with self.assertRaises(ASCIITransportFormat.DecodeError):
+            obj.decode(validate=True, max_size=1000)
+        self.assertEqual(obj.data, '1000000a')
+        self.assertTrue(obj.encoded)
+
+
+class TerminalRendererTest(unittest.TestCase):
+    def testRender(self):
+        """Test case for rendering encoded and decoded objects.
+        """
+        test_cases = [
+            ('', False, ''),
+            ('abc', False, 'abc'),
+            ('a' + ' '*20 + 'b', False, 'a\x1b[20Cb'),
+            ('a   b', False, 'a   b'),
+            ('ab   \n\ncd', False, 'ab\r\n\r\ncd'),
+            ('x'*30, False, 'x'*30),
+            ('x'*30, True, 'x\x1b[29b'),
+            ('xxx', True, 'xxx'),
+        ]
+        for data, repeat, expected in test_cases:
+            renderer = TerminalRenderer(repeat)
+            obj = ASCIITransportFormat(
+                ASCIITransportFormat.SupportedTypes.STRING,
+                data,
+            )
+            self.assertEqual(
+                renderer.render(obj), TerminalRenderer.CLEAR_SCREEN + expected)
+
+            obj.encode()
+            self.assertEqual(
+                renderer.render(obj), TerminalRenderer.CLEAR_SCREEN + expected)
+
+    def testRenderLongRuns(self):
+        """Test case for rendering encoded runs over the validated decoding
+        limits.
+        """
+        data = ' '*(2*1024*1024) + 'x'
+        obj = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            data,
+        )
+        obj.encode()
+        self.assertEqual(
+            TerminalRenderer().render(obj),
+            TerminalRenderer.CLEAR_SCREEN + '\x1b[2097152Cx',
+        )
+        self.assertEqual(obj.get_runs(), [(2*1024*1024, ' '), (1, 'x')])
+
+    def testRenderValidated(self):
+        """Test case for rendering untrusted objects with validation.
+        """
+        renderer = TerminalRenderer()
+        untrusted = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            '99999999999a',
+            encoded=True,
+        )
+        trusted = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            'abc',
+        )
+        with self.assertRaises(ASCIITransportFormat.DecodeError):
+            renderer.render(untrusted, validate=True)
+        with self.assertRaises(ASCIITransportFormat.DecodeError):
+            renderer.render_diff(trusted, untrusted, validate=True)
+        with self.assertRaises(ASCIITransportFormat.DecodeError):
+            renderer.render_diff(untrusted, trusted, validate=True)
+        with self.assertRaises(ASCIITransportFormat.DecodeError):
+            untrusted.get_runs(validate=True, max_run_length=10)
+
+        obj = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            '5a 5b',
+            encoded=True,
+        )
+        self.assertEqual(
+            renderer.render(obj, validate=True),
+            TerminalRenderer.CLEAR_SCREEN + 'aaaaabbbbb',
+        )
+        with self.assertRaises(ASCIITransportFormat.DecodeError):
+            renderer.render(obj, validate=True, max_size=9)
+        with self.assertRaises(ASCIITransportFormat.DecodeError):
+            renderer.render(obj, validate=True, max_run_length=4)
+
+        obj = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            'a'*10 + 'b'*10,
+        )
+        obj.encode(block_size=4)
+        self.assertTrue(obj.block_encode)
+        with self.assertRaises(ASCIITransportFormat.DecodeError):
+            renderer.render_diff(trusted, obj, validate=True, max_size=4)
+
+    def testRenderDiff(self):
+        """Test case for rendering only the changed cells between frames.
+        """
+        test_cases = [
+            ('abc\ndef', 'abc\ndef', ''),
+            ('abc\ndef', 'abc\ndxf', '\x1b[2;2Hx'),
+            ('abc', 'xbx', '\x1b[1;1Hxbx'),
+            ('a' + 'b'*20 + 'a', 'c' + 'b'*20 + 'c', '\x1b[1;1Hc\x1b[20Cc'),
+            ('abc', 'a', '\x1b[1;2H\x1b[K'),
+            ('abc   ', 'abc', ''),
+            ('abc', 'abc   ', ''),
+            ('abc\ndef', 'abc', '\x1b[2;1H\x1b[K'),
+            ('abc', 'abc\n' + 'x'*30, '\x1b[2;1H' + 'x'*30),
+        ]
+        for old_data, new_data, expected in test_cases:
+            old = ASCIITransportFormat(
+                ASCIITransportFormat.SupportedTypes.STRING,
+                old_data,
+            )
+            new = ASCIITransportFormat(
+                ASCIITransportFormat.SupportedTypes.STRING,
+                new_data,
+            )
+            new.encode()
+            self.assertEqual(
+                TerminalRenderer().render_diff(old, new), expected)
+
+        old = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            'abc',
+        )
+        new = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            'abc\n' + 'x'*30,
+        )
+        self.assertEqual(
+            TerminalRenderer(True).render_diff(old, new),
+            '\x1b[2;1Hx\x1b[29b',
+        )
+
+
+class FrameTest(unittest.TestCase):
+    test_cases = [
+        '',
+        'aaabbb',
+        'a b',
+        '\n\n\n',
+        'aaaa1111\nbbbb2222',
+        ''.join(['a'*1001, 'b'*909, 'c'*65, 'd'*2]),
+    ]
+
+    def makeObjects(self):
+        """Makes a mix of encoded and decoded objects from the test cases.
+        """
+        objects = []
+        for index, data in enumerate(self.test_cases):
+            obj = ASCIITransportFormat(
+                ASCIITransportFormat.SupportedTypes.STRING,
+                data,
+            )
+            if index % 2:
+                obj.encode()
+            objects.append(obj)
+        return objects
+
+    def assertObjectsEqual(self, received, sent):
+        """Asserts that received objects match the sent objects.
+        """
+        self.assertEqual(len(received), len(sent))
+        for received_obj, sent_obj in zip(received, sent):
+            self.assertEqual(received_obj.data, sent_obj.data)
+            self.assertEqual(received_obj.encoded, sent_obj.encoded)
+            self.assertEqual(
+                received_obj.pseudo_encode, sent_obj.pseudo_encode)
+
+    def testFeedIncremental(self):
+        """Test case for decoding frames fed one byte at a time.
+        """
+        objects = self.makeObjects()
+        for compress in (False, True):
+            writer = FrameWriter(compress=compress)
+            data = writer.pack(objects[:2]) + writer.pack(objects[2:])
+
+            reader = FrameReader()
+            received = []
+            for index in range(len(data)):
+                received.extend(reader.feed(data[index:index + 1]))
+            self.assertObjectsEqual(received, objects)
+            self.assertFalse(reader.buffer)
+
+    def testFeedErrors(self):
+        """Test case for rejecting oversized and malformed frames.
+        """
+        objects = self.makeObjects()
+        with self.assertRaises(ValueError):
+            FrameReader(16).feed(FrameWriter().pack(objects))
+        with self.assertRaises(ValueError):
+            FrameReader(16).feed(FrameWriter(compress=True).pack(
+                [ASCIITransportFormat(
+                    ASCIITransportFormat.SupportedTypes.STRING,
+                    ' '*1000,
+                )]
+            ))
+        with self.assertRaises(ValueError):
+            FrameReader().feed(FrameWriter.HEADER.pack(0, 3) + b'abc')
+
+    def testFeedMalformed(self):
+        """Test case for rejecting frames with malformed payloads.
+        """
+        def frame(flags, payload):
+            return FrameWriter.HEADER.pack(flags, len(payload)) + payload
+
+        def element(data):
+            return FrameWriter.LENGTH.pack(len(data)) + data
+
+        compressed = zlib.compress(element(b'{}'))
+        test_cases = [
+            frame(0, element(b'{}')),
+            frame(0, element(b'[1]')),
+            frame(0, element(b'not json')),
+            frame(0, element(b'\xff')),
+            frame(0, element(
+                b'{"data": 5, "encoded": false, "pseudo_encode": false}')),
+            frame(0, element(
+                b'{"data": "", "encoded": 1, "pseudo_encode": false}')),
+            frame(0x02, b''),
+            frame(FrameWriter.FLAG_COMPRESSED, b'not zlib'),
+            frame(FrameWriter.FLAG_COMPRESSED, compressed[:-1]),
+            frame(FrameWriter.FLAG_COMPRESSED, compressed + b'extra'),
+        ]
+        for data in test_cases:
+            with self.assertRaises(ValueError):
+                FrameReader().feed(data)
+
+        valid = frame(0, element(
+            b'{"data": "3a", "encoded": true, "pseudo_encode": false}'))
+        obj, = FrameReader().feed(valid)
+        self.assertEqual(obj.data, '3a')
+        self.assertTrue(obj.encoded)
+        self.assertFalse(obj.pseudo_encode)
+        self.assertFalse(obj.block_encode)
+
+    def testFeedAfterValidFrame(self):
+        """Test case for a bad frame following a valid one in a single chunk.
+        """
+        objects = self.makeObjects()
+        bad_frame = FrameWriter.HEADER.pack(0x04, 0)
+
+        reader = FrameReader()
+        received = reader.feed(FrameWriter().pack(objects) + bad_frame)
+        self.assertObjectsEqual(received, objects)
+        self.assertEqual(bytes(reader.buffer), bad_frame)
+        with self.assertRaises(ValueError):
+            reader.feed(b'')
+        self.assertEqual(bytes(reader.buffer), bad_frame)
+
+        writer_sock, reader_sock = socket.socketpair()
+        writer_sock.sendall(FrameWriter().pack(objects) + bad_frame)
+        writer_sock.close()
+        received = []
+        with self.assertRaisesRegex(ValueError, 'Unknown frame flags'):
+            for obj in FrameReader().read(reader_sock):
+                received.append(obj)
+        self.assertObjectsEqual(received, objects)
+        reader_sock.close()
+
+    def testSocketPair(self):
+        """Test case for sending many batches over one socket.
+        """
+        objects = self.makeObjects()
+        batches = 200
+        for compress in (False, True):
+            writer_sock, reader_sock = socket.socketpair()
+
+            def write():
+                writer = FrameWriter(writer_sock, compress)
+                for _ in range(batches):
+                    writer.send(objects)
+                writer_sock.close()
+
+            thread = threading.Thread(target=write)
+            thread.start()
+            received = list(FrameReader().read(reader_sock))
+            thread.join()
+            reader_sock.close()
+
+            self.assertObjectsEqual(received, objects * batches)
+
+    def testSocketPairTruncated(self):
+        """Test case for a stream that ends in the middle of a frame.
+        """
+        writer_sock, reader_sock = socket.socketpair()
+        writer_sock.sendall(FrameWriter().pack(self.makeObjects())[:-1])
+        writer_sock.close()
+        with self.assertRaises(ValueError):
+            list(FrameReader().read(reader_sock))
+        reader_sock.close()
+
+
+class BlockEncodeTest(unittest.TestCase):
+    test_cases = [
+        '\n',
+        'a b',
+        'aaaa1111\nbbbb2222',
+        'a|b,c' * 100,
+        ''.join(['a'*1001, 'b'*909, 'c'*65, 'd'*2]),
+        ''.join(chr(ord('!') + i % 90) for i in range(1000)),
+    ]
+
+    def makeMixed(self):
+        """Makes mixed content of dense text and wide whitespace regions.
+        """
+        dense = '\n'.join(
+            ''.join(chr(ord('!') + (i * 7 + j * 13) % 90) for j in range(60))
+            for i in range(20)
+        )
+        sparse = '\n'.join(' '*70 + 'x' for _ in range(30))
+        return '\n'.join([dense, sparse, dense[:500]])
+
+    def testEncodeDecodeBlocksEmpty(self):
+        """Test case for block encoding and decoding an empty string.
+        """
+        empty_case = ''
+        encoded_result = ASCIITransportFormat.encode_blocks_data(empty_case)
+        self.assertEqual(encoded_result, empty_case)
+        decoded_result = ASCIITransportFormat.decode_blocks_data(
+            encoded_result)
+        self.assertEqual(decoded_result, empty_case)
+
+    def testEncodeDecodeBlocks(self):
+        """Test case for block encoding and decoding non-empty strings.
+        """
+        for data in self.test_cases + [self.makeMixed()]:
+            for block_size in (1, 16, None):
+                encoded_result = ASCIITransportFormat.encode_blocks_data(
+                    data, block_size)
+                for validate in (False, True):
+                    decoded_result = ASCIITransportFormat.decode_blocks_data(
+                        encoded_result, validate)
+                    self.assertEqual(decoded_result, data)
+
+    def testEncodeBlocksSizeValueError(self):
+        """Test case for block encoding with a bad block size.
+        """
+        for block_size in (0, -1, -4):
+            for data in ('', 'hello world'):
+                with self.assertRaises(ValueError):
+                    ASCIITransportFormat.encode_blocks_data(data, block_size)
+
+                obj = ASCIITransportFormat(
+                    ASCIITransportFormat.SupportedTypes.STRING,
+                    data,
+                )
+                with self.assertRaises(ValueError):
+                    obj.encode(block_size=block_size)
+                self.assertEqual(obj.data, data)
+                self.assertFalse(obj.encoded)
+                self.assertFalse(obj.block_encode)
+
+    def testEncodeBlocksCodecs(self):
+        """Test case for the codec picked for each block.
+        """
+        test_cases = [
+            ('abc', 1, 'r3|abc'),
+            ('aaaab', 4, 'l2,r1|4ab'),
+            ('abcaaaaaa', 3, 'r3,l2|abc6a'),
+        ]
+        for data, block_size, expected in test_cases:
+            encoded_result = ASCIITransportFormat.encode_blocks_data(
+                data, block_size)
+            self.assertEqual(encoded_result, expected)
+
+    def testEncodeBlocksMixed(self):
+        """Test case for block encoding beating both global choices on
+        mixed content.
+        """
+        data = self.makeMixed()
+        encoded_result = ASCIITransportFormat.encode_blocks_data(data)
+        self.assertLess(len(encoded_result), len(data))
+        self.assertLess(
+            len(encoded_result),
+            len(ASCIITransportFormat.encode_data(data)),
+        )
+
+    def testDecodeBlocksMalformed(self):
+        """Test case for malformed block encoded data being rejected.
+        """
+        test_cases = [
+            'abc',
+            'r4|abc',
+            'r2|abc',
+            'x3|abc',
+            'r|abc',
+            'l3|3a ',
+            'z3|abc',
+        ]
+        for data in test_cases:
+            with self.assertRaises(ASCIITransportFormat.DecodeError):
+                ASCIITransportFormat.decode_blocks_data(data, True)
+
+    def testDecodeBlocksLimits(self):
+        """Test case for block encoded data over the maximum size.
+        """
+        block = ASCIITransportFormat._encode_zlib_block(' '*100000)
+        data = 'z{}|{}'.format(len(block), block)
+        self.assertEqual(
+            ASCIITransportFormat.decode_blocks_data(data), ' '*100000)
+        with self.assertRaises(ASCIITransportFormat.DecodeError):
+            ASCIITransportFormat.decode_blocks_data(data, True, 1000)
+        with self.assertRaises(ASCIITransportFormat.DecodeError):
+            ASCIITransportFormat.decode_blocks_data(
+                'r3,l3|abc3a', True, 5)
+
+        # An exhausted budget must not turn into an unlimited zlib block.
+        data = 'r3,z{}|abc{}'.format(len(block), block)
+        with self.assertRaises(ASCIITransportFormat.DecodeError) as ctx:
+            ASCIITransportFormat.decode_blocks_data(data, True, 3)
+        self.assertEqual(ctx.exception.offset, data.index('|') + 4)
+        with self.assertRaises(ASCIITransportFormat.DecodeError):
+            ASCIITransportFormat.decode_blocks_data(data, True, 1000)
+
+    def testDecodeBlocksOffsets(self):
+        """Test case for block errors being reported at their offset in the
+        whole data.
+        """
+        block = ASCIITransportFormat._encode_zlib_block('hello world ' * 10)
+        invalid = base64.b85encode(zlib.compress(b'\xff\xfe')).decode()
+        test_cases = [
+            ('r3,z{}|abc{}'.format(len(block) - 5, block[:-5]), 3),
+            ('r3,z{}|abc{}'.format(len(block) + 5, block + '00000'), 3),
+            ('r3,z{}|abc{}'.format(len(invalid), invalid), 3),
+            ('r3,l6|abc3a 3b ', 6),
+            ('r' + '9'*5000 + '|abc', 0),
+            ('r\u00b2|a', 0),
+            ('r\u0661|a', 0),
+        ]
+        for data, block_offset in test_cases:
+            with self.assertRaises(ASCIITransportFormat.DecodeError) as ctx:
+                ASCIITransportFormat.decode_blocks_data(data, True)
+            self.assertEqual(
+                ctx.exception.offset, data.index('|') + 1 + block_offset)
+
+    def testEncodeDecodeBlocksObject(self):
+        """Test case for block encoding using an ASCIITransportFormat
+        object sent as JSON.
+        """
+        data = self.makeMixed()
+        obj = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            data,
+        )
+        obj.encode(block_size=256)
+        self.assertTrue(obj.encoded)
+        self.assertFalse(obj.pseudo_encode)
+        self.assertTrue(obj.block_encode)
+        self.assertEqual(
+            obj.data, ASCIITransportFormat.encode_blocks_data(data, 256))
+        self.assertEqual(
+            TerminalRenderer().render(obj),
+            TerminalRenderer().render(ASCIITransportFormat(
+                ASCIITransportFormat.SupportedTypes.STRING,
+                data,
+            )),
+        )
+
+        obj = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.JSON,
+            obj.json(),
+        )
+        self.assertTrue(obj.block_encode)
+        obj.decode()
+        self.assertEqual(obj.data, data)
+        self.assertFalse(obj.encoded)
+        self.assertFalse(obj.block_encode)
+
+        obj = ASCIITransportFormat(
+            ASCIITransportFormat.SupportedTypes.STRING,
+            'abc',
+        )
+        obj.encode(block_size=256)
+        self.assertEqual(obj.data, 'abc')
+        self.assertTrue(obj.pseudo_encode)
+        self.assertFalse(obj.block_encode)
+
+
 if __name__ == "__main__":
     unittest.main()